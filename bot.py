@@ -1,8 +1,22 @@
 # bot.py
-# Version 3.4.0
+# Version 3.4.5
 """
 Core bot module that sets up the Discord bot and defines main event handlers.
 
+CHANGES v3.4.5: Dropped the on_ready utils.history.preload() call — this
+  module and the command modules resolve every lazy history name at import
+
+CHANGES v3.4.4: loaded_history_channels stamped with time.time(), matching
+  channel_coordinator (datetime import dropped)
+
+CHANGES v3.4.3: on_ready() also runs utils.history.preload() off the event loop
+
+CHANGES v3.4.2: on_ready() preloads the tokenizer (token_counter.warmup) off
+  the event loop, so the first API request skips the encoder load
+
+CHANGES v3.4.1: User messages stored via add_message_to_history() so they carry
+  write-time "_tokens" counts
+
 CHANGES v3.4.0: Wrap build_context_for_provider() in asyncio.to_thread() (SOW v6.2.0)
 - FIXED: Both direct-address and auto-respond call sites now await asyncio.to_thread()
   to prevent synchronous retrieval (SQLite + HTTP) from blocking the event loop.
@@ -53,23 +67,24 @@ CHANGES v2.5.0: Refactored provider utilities into separate module
 CHANGES v2.4.0: Refactored message utilities into separate module
 """
 import asyncio
+import time
 import discord
 from discord.ext import commands
-import datetime
 
 from config import (
     DEFAULT_AUTO_RESPOND, MAX_HISTORY,
     MAX_RESPONSE_TOKENS, BOT_PREFIX
 )
 from utils.history import (
-    load_channel_history,
-    channel_history, loaded_history_channels
+    load_channel_history, channel_history, loaded_history_channels
 )
+from utils.history.storage import add_message_to_history
 from utils.logging_utils import get_logger
 from utils.message_utils import format_user_message_for_history
 from utils.provider_utils import parse_provider_override
 from utils.response_handler import handle_ai_response
 from utils.context_manager import build_context_for_provider
+from utils.token_counter import warmup as warmup_tokenizer
 from ai_providers import get_provider
 from utils.raw_events import setup_raw_events, startup_backfill
 
@@ -114,6 +129,9 @@ def create_bot():
             auto_respond_channels.clear()
             logger.info("Default auto-respond setting is disabled")
 
+        # Load the tokenizer now rather than inside the first request
+        await asyncio.to_thread(warmup_tokenizer)
+
         # Backfill any messages missed while the bot was offline
         await startup_backfill(bot)
 
@@ -146,7 +164,7 @@ def create_bot():
                     await load_channel_history(message.channel, is_automatic=True)
                     if len(channel_history[channel_id]) > 0:
                         logger.info(f"Auto-loaded {len(channel_history[channel_id])} messages for channel #{message.channel.name}")
-                loaded_history_channels[channel_id] = datetime.datetime.now()
+                loaded_history_channels[channel_id] = time.time()
                 logger.debug(f"Added channel #{message.channel.name} to loaded_history_channels")
             except Exception as e:
                 logger.error(f"Failed to load history for channel #{message.channel.name}: {str(e)}")
@@ -171,9 +189,10 @@ def create_bot():
                 len(channel_history[channel_id]),
                 msg_id=message.id
             )
-            channel_history[channel_id].append(user_message)
+            add_message_to_history(channel_id, user_message)
 
-            # Trim to MAX_HISTORY
+            # Trim to MAX_HISTORY. Rebind, not del: a context build in a
+            # worker thread may still be iterating the old list
             if len(channel_history[channel_id]) > MAX_HISTORY:
                 channel_history[channel_id] = channel_history[channel_id][-MAX_HISTORY:]
 
@@ -201,9 +220,10 @@ def create_bot():
             len(channel_history[channel_id]),
             msg_id=message.id
         )
-        channel_history[channel_id].append(user_message)
+        add_message_to_history(channel_id, user_message)
 
-        # Trim to MAX_HISTORY
+        # Trim to MAX_HISTORY. Rebind, not del: a context build in a
+        # worker thread may still be iterating the old list
         if len(channel_history[channel_id]) > MAX_HISTORY:
             channel_history[channel_id] = channel_history[channel_id][-MAX_HISTORY:]
 
@@ -1,8 +1,12 @@
 # commands/history_commands.py
-# Version 2.2.0
+# Version 2.2.2
 """
 History management commands for the Discord bot.
 
+CHANGES v2.2.2: reload stamps loaded_history_channels with time.time(),
+  matching the loader (was True)
+CHANGES v2.2.1: Prompt-update display strips the SYSTEM_PROMPT_UPDATE: prefix
+  with removeprefix() (was a full-string replace of every occurrence)
 CHANGES v2.2.0: Truncate long message content in !history display to prevent
   single entries from exceeding Discord's 2000-char limit
 CHANGES v2.1.0: ℹ️ prefix tagging for noise filtering
@@ -16,6 +20,7 @@ Usage:
   !history clean     - Remove commands and artifacts from history
   !history reload    - Reload history from Discord
 """
+import time
 from config import HISTORY_LINE_PREFIX
 from utils.history import channel_history, loaded_history_channels
 from utils.history.message_processing import (
@@ -105,8 +110,8 @@ def register_history_commands(bot):
             elif role == "system":
                 if content.startswith("SYSTEM_PROMPT_UPDATE:"):
                     prefix = "System"
-                    content = content.replace(
-                        "SYSTEM_PROMPT_UPDATE:", "Set prompt:").strip()
+                    content = "Set prompt:" + content.removeprefix(
+                        "SYSTEM_PROMPT_UPDATE:").rstrip()
                 else:
                     prefix = "System"
             else:
@@ -165,7 +170,7 @@ def register_history_commands(bot):
                 del loaded_history_channels[channel_id]
             async with ctx.typing():
                 await load_channel_history(ctx.channel, is_automatic=False)
-            loaded_history_channels[channel_id] = True
+            loaded_history_channels[channel_id] = time.time()
             count = len(channel_history.get(channel_id, []))
             await ctx.send(f"{_I}History reloaded: {count} messages loaded.")
         except Exception as e:
@@ -1,8 +1,12 @@
 # commands/thinking_commands.py
-# Version 2.2.0
+# Version 2.2.2
 """
 Thinking display management command for the Discord bot.
 
+CHANGES v2.2.2: Precomputed on/off keyword frozensets; interned setting token
+
+CHANGES v2.2.1: Bind ctx.channel / ctx.author attributes once per invocation
+
 CHANGES v2.2.0: ℹ️/⚙️ prefix tagging for noise filtering
 - Settings changes prefixed with ⚙️ (persist for replay)
 - Status/error output prefixed with ℹ️ (filter everywhere)
@@ -15,6 +19,7 @@ Usage:
   !thinking on     - Enable DeepSeek thinking display (admin only)
   !thinking off    - Disable DeepSeek thinking display (admin only)
 """
+import sys
 from utils.logging_utils import get_logger
 
 logger = get_logger('commands.thinking')
@@ -22,6 +27,9 @@ logger = get_logger('commands.thinking')
 _I = "ℹ️ "
 _S = "⚙️ "
 
+_ENABLE_WORDS = frozenset(map(sys.intern, ('on', 'enable', 'enabled', 'true', '1')))
+_DISABLE_WORDS = frozenset(map(sys.intern, ('off', 'disable', 'disabled', 'false', '0')))
+
 # Per-channel thinking display preference. Default False (off).
 channel_thinking_enabled = {}
 
@@ -52,15 +60,17 @@ def register_thinking_commands(bot):
     @bot.command(name='thinking')
     async def thinking_cmd(ctx, setting=None):
         """Manage DeepSeek thinking display for this channel."""
-        channel_id = ctx.channel.id
-        channel_name = ctx.channel.name
+        channel = ctx.channel
+        channel_id = channel.id
+        channel_name = channel.name
+        author_name = ctx.author.display_name
 
         if setting is None:
             current = get_thinking_enabled(channel_id)
             status = "enabled" if current else "disabled"
             logger.debug(
                 f"Thinking status requested for #{channel_name} "
-                f"by {ctx.author.display_name}: {status}"
+                f"by {author_name}: {status}"
             )
             await ctx.send(
                 f"{_I}DeepSeek thinking display is currently "
@@ -75,15 +85,15 @@ def register_thinking_commands(bot):
             )
             logger.warning(
                 f"Unauthorized thinking change attempt by "
-                f"{ctx.author.display_name} in #{channel_name}"
+                f"{author_name} in #{channel_name}"
             )
             return
 
-        setting = setting.strip().lower()
-        if setting in ['on', 'enable', 'enabled', 'true', '1']:
+        setting = sys.intern(setting.strip().lower())
+        if setting in _ENABLE_WORDS:
             enabled = True
             action = "enabled"
-        elif setting in ['off', 'disable', 'disabled', 'false', '0']:
+        elif setting in _DISABLE_WORDS:
             enabled = False
             action = "disabled"
         else:
@@ -100,7 +110,7 @@ def register_thinking_commands(bot):
             )
             logger.info(
                 f"Thinking display {action} for #{channel_name} "
-                f"by {ctx.author.display_name}"
+                f"by {author_name}"
             )
         else:
             await ctx.send(
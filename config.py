@@ -1,8 +1,12 @@
 # config.py
-# Version 1.20.0
+# Version 1.22.1
 """
 Bot configuration - all settings loaded from environment variables with defaults.
 
+CHANGES v1.22.1: REMOVED EAGER_IMPORT (v1.22.0) — no effect in the bot process
+CHANGES v1.21.0: TOKENIZER_BACKEND — 'auto' (default) prefers an installed
+  tiktoken drop-in (riptoken, tokendagger, rs_bpe); or name one to force it
+
 CHANGES v1.20.0: v7.0.0 M1 context injection configuration (SOW v7.0.0)
 - ADDED: CONTROL_FILE_PATH — path to operator control file injected into system prompt
 - ADDED: SESSION_GAP_MINUTES — session boundary gap for session bridge calculation;
@@ -96,6 +100,8 @@ DEFAULT_TEMPERATURE = float(os.environ.get('DEFAULT_TEMPERATURE', 0.7))
 # (especially for Anthropic where tiktoken is approximate ~10-15%), per-message
 # formatting overhead, and provider-side hidden tokens.
 CONTEXT_BUDGET_PERCENT = int(os.environ.get('CONTEXT_BUDGET_PERCENT', 80))
+# Budget tokenizer (cl100k_base): 'auto' = riptoken, tokendagger, rs_bpe, tiktoken
+TOKENIZER_BACKEND = os.environ.get('TOKENIZER_BACKEND', 'auto').lower()
 
 # Database configuration
 # Path to SQLite database file for message persistence. The data/ directory
@@ -1,12 +1,21 @@
 # utils/ai_utils.py
-# Version 1.0.0
+# Version 1.1.1
 """
 AI-related utility functions for the Discord bot.
 
+CHANGES v1.1.1: Non-string responses log their type instead of length -1
+
+CHANGES v1.1.0: Drop len(str(response)) from the success debug log
+- REMOVED: str() coercion of the full response on every call (forced a repr
+  of dict responses even with DEBUG disabled)
+- MODIFIED: debug calls use %-style args; response length only computed
+  when DEBUG is enabled and the response is a string
+
 CHANGES v1.0.0: Added version header (SOW v2.20.0)
 - ADDED: Version header for tracking
 - NOTE: provider_override parameter added in earlier unversioned change
 """
+import logging
 from ai_providers import get_provider
 from utils.logging_utils import get_logger
 
@@ -29,7 +38,7 @@ async def generate_ai_response(messages, max_tokens=None, temperature=None,
         str or dict: Response from provider (format depends on provider)
     """
     try:
-        logger.debug(f"Generating AI response for channel {channel_id}")
+        logger.debug("Generating AI response for channel %s", channel_id)
 
         if provider_override:
             logger.info(f"Using provider override: {provider_override}")
@@ -37,13 +46,19 @@ async def generate_ai_response(messages, max_tokens=None, temperature=None,
         else:
             provider = get_provider(channel_id=channel_id)
 
-        logger.debug(f"Using {provider.name} provider for response generation")
+        logger.debug("Using %s provider for response generation", provider.name)
 
         response = await provider.generate_ai_response(
             messages, max_tokens, temperature, channel_id
         )
 
-        logger.debug(f"AI response generated successfully (length: {len(str(response))} chars)")
+        if logger.isEnabledFor(logging.DEBUG):
+            if isinstance(response, str):
+                logger.debug("AI response generated successfully (length: %d chars)",
+                             len(response))
+            else:
+                logger.debug("AI response generated successfully (type: %s)",
+                             type(response).__name__)
         return response
 
     except Exception as e:
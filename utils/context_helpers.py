@@ -1,9 +1,12 @@
 # utils/context_helpers.py
-# Version 1.0.0
+# Version 1.1.1
 """
 Helper functions for context assembly (SOW v7.0.0 M1).
 Extracted from context_manager.py to respect the 250-line limit.
 
+CHANGES v1.1.1: _trim_to_budget() batch-primes token counts before the scan
+CHANGES v1.1.0: _trim_to_budget() uses cached count_message_tokens()
+
 CREATED v1.0.0:
 - _load_summary() — load channel summary dict
 - read_control_file() — mtime-cached control file injection
@@ -67,10 +70,11 @@ def _trim_to_budget(msgs, max_tokens):
     """Trim oldest messages to fit within max_tokens.
     Returns (block, tokens_used).
     """
-    from utils.context_manager import estimate_tokens, MSG_OVERHEAD
+    from utils.token_counter import count_message_tokens, prime_message_tokens
+    prime_message_tokens(msgs)
     block, used = [], 0
     for msg in reversed(msgs):
-        t = estimate_tokens(msg["content"]) + MSG_OVERHEAD
+        t = count_message_tokens(msg)
         if used + t > max_tokens:
             break
         block.append(msg)
@@ -1,14 +1,21 @@
 # utils/context_manager.py
-# Version 3.0.3
+# Version 3.4.1
 """
 Token-budget-aware context management and usage tracking.
 
-CHANGES v3.0.3: Reverse dedup — Layer 2 canonical; selected only adds SQLite-missing msgs
+CHANGES v3.4.1: Recent-message selection back to the newest-first loop (the
+  prefix-sum + bisect cutoff counted every candidate, even past the budget)
 
-CHANGES v3.0.2: Add /tmp/last_full_context.json DEBUG dump (full messages array)
-
-CHANGES v3.0.1: Fix always_on receipt missing total_tokens key (overview + control)
+CHANGES v3.4.0: System prompt counted once (prompts.get_system_prompt_tokens);
+  Layer 1 and final system counts only encode the text appended to it
+CHANGES v3.3.x: lazy log args
+CHANGES v3.2.x: Per-channel usage briefly stored as a NumPy array; reverted
+  to the _channel_usage dicts (no array consumer, slower per-call adds)
+CHANGES v3.1.x: Token counting moved to token_counter.py (estimate_tokens,
+  MSG_OVERHEAD re-exported); per-message count cache, batch priming of
+  recent-message candidates, prefix-sum + bisect budget cutoff
 
+CHANGES v3.0.1–v3.0.3: receipt total fix, DEBUG dump, Layer 2 canonical dedup
 CHANGES v3.0.0: Three-layer context assembly (SOW v7.0.0 M1)
 - ADDED: read_control_file() — re-exported from context_helpers
 - MODIFIED: build_context_for_provider() — Layer 1 (system+control+always-on),
@@ -20,50 +27,29 @@ CHANGES v2.4.0: Return (messages, receipt_data) tuple (SOW v5.7.0)
 CHANGES v2.3.0: Extract retrieval to context_retrieval.py (SOW v5.6.0)
 CREATED v1.0.0: Initial implementation (SOW v2.23.0)
 """
+import logging
 from collections import defaultdict
 from datetime import date
 from config import CONTEXT_BUDGET_PERCENT, MAX_RECENT_MESSAGES, LAYER2_BUDGET_PCT
 from utils.history.message_processing import prepare_messages_for_api
+from utils.history.prompts import get_system_prompt_tokens
 from utils.context_helpers import (
     _load_summary, read_control_file, _merge_dedup_sort,
     _trim_to_budget, _format_as_turn)
+from utils.token_counter import (
+    estimate_tokens, count_message_tokens, MSG_OVERHEAD)
 from utils.logging_utils import get_logger
 
 logger = get_logger('context_manager')
 
-_tiktoken_encoding = None
-_tiktoken_available = None
-MSG_OVERHEAD = 4
 _channel_usage = defaultdict(lambda: {"input": 0, "output": 0, "calls": 0})
 
 
-def _get_encoding():
-    global _tiktoken_encoding, _tiktoken_available
-    if _tiktoken_available is None:
-        try:
-            import tiktoken
-            _tiktoken_encoding = tiktoken.get_encoding("cl100k_base")
-            _tiktoken_available = True
-        except ImportError:
-            _tiktoken_available = False
-            logger.warning("tiktoken not installed — using character estimate")
-    return _tiktoken_encoding
-
-
-def estimate_tokens(text):
-    """Estimate token count. Uses tiktoken if available, else len/3.2."""
-    if not text:
-        return 0
-    enc = _get_encoding()
-    return len(enc.encode(text)) if enc is not None else int(len(text) / 3.2)
-
-
 def record_usage(channel_id, provider_name, input_tokens, output_tokens):
     """Record token usage from an API call."""
     total = input_tokens + output_tokens
-    logger.info(
-        f"Token usage [{provider_name}] ch:{channel_id}: "
-        f"{input_tokens} in + {output_tokens} out = {total} total")
+    logger.info("Token usage [%s] ch:%s: %d in + %d out = %d total",
+                provider_name, channel_id, input_tokens, output_tokens, total)
     if channel_id is not None:
         u = _channel_usage[channel_id]
         u["input"] += input_tokens
@@ -92,14 +78,14 @@ def build_context_for_provider(channel_id, provider):
 
     all_messages = prepare_messages_for_api(channel_id)
     if not all_messages:
-        logger.warning(f"No messages for channel {channel_id}")
+        logger.warning("No messages for channel %s", channel_id)
         return all_messages, None, {}
 
     context_window = provider.max_context_length
     max_output = provider.max_response_tokens
     budget = int(context_window * CONTEXT_BUDGET_PERCENT / 100) - max_output
     if budget <= 0:
-        logger.warning(f"Token budget non-positive ({budget}) for {provider.name}")
+        logger.warning("Token budget non-positive (%d) for %s", budget, provider.name)
         return all_messages, None, {}
 
     system_msg = all_messages[0]
@@ -119,7 +105,8 @@ def build_context_for_provider(channel_id, provider):
     control_tokens = estimate_tokens(control)
     today = date.today().isoformat()
 
-    base_content = system_msg["content"]
+    prompt = system_msg["content"]
+    base_content = prompt
     if control:
         base_content += f"\n\n{control}"
     if always_on:
@@ -127,10 +114,11 @@ def build_context_for_provider(channel_id, provider):
             f"\n\n--- CONVERSATION CONTEXT ---\n"
             f"Today's date: {today}\n\n{always_on}")
 
-    base_tokens = estimate_tokens(base_content) + MSG_OVERHEAD
+    base_tokens = (get_system_prompt_tokens(channel_id, prompt)
+                   + estimate_tokens(base_content[len(prompt):]))
     remaining = budget - base_tokens
     if remaining <= 0:
-        logger.warning(f"Layer 1 ({base_tokens} tok) exceeds budget ({budget})")
+        logger.warning("Layer 1 (%d tok) exceeds budget (%d)", base_tokens, budget)
         return [{"role": "system", "content": base_content}], None, {}
 
     # ── Layer 2: Conversation continuity (guaranteed) ──
@@ -166,10 +154,10 @@ def build_context_for_provider(channel_id, provider):
             f"\n\n--- CONVERSATION CONTEXT ---\nToday's date: {today}\n\n"
             f"The following is a summary of this channel's conversation "
             f"history.\n\n{format_summary_for_context(summary)}")
-        logger.warning(f"Retrieval fully degraded ch:{channel_id}")
+        logger.warning("Retrieval fully degraded ch:%s", channel_id)
 
-    logger.debug(f"Context block (first 2000):\n{system_content[:2000]}")
-    if logger.isEnabledFor(10):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Context block (first 2000):\n%s", system_content[:2000])
         try:
             with open('/tmp/last_system_prompt.txt', 'w') as _f:
                 _f.write(system_content)
@@ -177,7 +165,7 @@ def build_context_for_provider(channel_id, provider):
             pass
 
     # ── Assemble turns ──
-    system_tokens = estimate_tokens(system_content) + MSG_OVERHEAD
+    system_tokens = base_tokens + estimate_tokens(system_content[len(base_content):])
     conv_budget = budget - system_tokens - layer2_tokens
     layer2_ids = {m["id"] for m in continuity_block}
     layer2_turns = [_format_as_turn(m) for m in continuity_block]
@@ -187,7 +175,7 @@ def build_context_for_provider(channel_id, provider):
             continue
         if len(selected) >= MAX_RECENT_MESSAGES:
             break
-        t = estimate_tokens(msg["content"]) + MSG_OVERHEAD
+        t = count_message_tokens(msg)
         if used + t > conv_budget:
             break
         selected.append(msg)
@@ -196,7 +184,7 @@ def build_context_for_provider(channel_id, provider):
 
     dropped = len(conversation_msgs) - len(selected)
     if dropped > 0:
-        logger.info(f"Token budget trim: dropped {dropped} msgs ch:{channel_id}")
+        logger.info("Token budget trim: dropped %d msgs ch:%s", dropped, channel_id)
 
     total_tokens = system_tokens + layer2_tokens + used
     if summary and cluster_receipt:
@@ -240,7 +228,7 @@ def build_context_for_provider(channel_id, provider):
         }
 
     final_messages = [{"role": "system", "content": system_content}] + layer2_turns + selected
-    if logger.isEnabledFor(10):
+    if logger.isEnabledFor(logging.DEBUG):
         try:
             import json
             with open('/tmp/last_full_context.json', 'w') as _f:
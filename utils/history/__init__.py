@@ -1,8 +1,32 @@
 # utils/history/__init__.py
-# Version 3.2.0
+# Version 3.4.3
 """
 History management package for Discord bot.
 
+CHANGES v3.4.3: Note tying the TYPE_CHECKING imports to _SUBMOD_ATTRS
+CHANGES v3.4.2: REMOVED EAGER_IMPORT (no effect in the bot process, whose
+  imports already resolve every name); preload() documented as for other
+  entry points
+
+CHANGES v3.4.1: Comment the __getattr__ globals() write-back (hot-path guard)
+CHANGES v3.4.0: Startup preloading
+- ADDED: preload() — imports every lazy submodule and binds its public names
+- ADDED: EAGER_IMPORT config escape hatch — preload() at package import
+CHANGES v3.3.4: _NAME_TO_MODULE holds ready-to-import relative paths, so
+  __getattr__ is a dict get plus one import_module() (no per-call f-string)
+CHANGES v3.3.3: _SUBMOD_ATTRS (submodule -> names) is the one hand-kept table;
+  _NAME_TO_MODULE and __all__ are derived from it so they cannot drift apart
+CHANGES v3.3.2: __dir__() lists the lazy public names; TYPE_CHECKING block
+  with the explicit imports so type checkers and IDEs resolve them
+CHANGES v3.3.1: __all__ is a tuple (immutable public API, no list built)
+
+CHANGES v3.3.0: Lazy submodule loading (PEP 562)
+- MODIFIED: public names resolve through module __getattr__ via the _LAZY
+  name -> submodule table; first access imports the submodule and binds the
+  value into the package globals so later lookups skip __getattr__
+- RESULT: importing utils.history no longer loads channel_coordinator /
+  discord_loader (and discord.py) until load_channel_history is used
+
 CHANGES v3.2.0: Consolidation — remove passthrough layers (SOW v5.11.0)
 - DELETED: api_imports.py, api_exports.py (pure passthrough files)
 - DELETED: loading.py (passthrough; load_channel_history moved to channel_coordinator.py)
@@ -22,37 +46,71 @@ Public API — only the symbols external code actually imports from this package
 All other history internals are accessed directly from their submodules.
 """
 
-from .storage import (
-    channel_history,
-    loaded_history_channels,
-    channel_system_prompts,
-    channel_ai_providers,
-)
-
-from .prompts import (
-    get_system_prompt,
-    set_system_prompt,
-    remove_system_prompt,
-    get_ai_provider,
-    set_ai_provider,
-    remove_ai_provider,
-)
-
-from .channel_coordinator import load_channel_history
-
-__all__ = [
-    # Storage
-    'channel_history',
-    'loaded_history_channels',
-    'channel_system_prompts',
-    'channel_ai_providers',
-    # Prompts & providers
-    'get_system_prompt',
-    'set_system_prompt',
-    'remove_system_prompt',
-    'get_ai_provider',
-    'set_ai_provider',
-    'remove_ai_provider',
-    # Loading
-    'load_channel_history',
-]
+import importlib
+from typing import TYPE_CHECKING
+
+# Static-analysis mirror of _SUBMOD_ATTRS below (never executed). Keep the
+# two in sync: add or remove a public name in both places.
+if TYPE_CHECKING:
+    from .storage import (
+        channel_history, loaded_history_channels,
+        channel_system_prompts, channel_ai_providers,
+    )
+    from .prompts import (
+        get_system_prompt, set_system_prompt, remove_system_prompt,
+        get_ai_provider, set_ai_provider, remove_ai_provider,
+    )
+    from .channel_coordinator import load_channel_history
+
+# Owning submodule -> public names: the single source for both the lazy
+# lookup table and __all__. Submodules are imported on first access
+# (PEP 562 module __getattr__), so `from utils.history import channel_history`
+# no longer pulls in the Discord loader stack.
+_SUBMOD_ATTRS = {
+    'storage': (
+        'channel_history', 'loaded_history_channels',
+        'channel_system_prompts', 'channel_ai_providers',
+    ),
+    'prompts': (
+        'get_system_prompt', 'set_system_prompt', 'remove_system_prompt',
+        'get_ai_provider', 'set_ai_provider', 'remove_ai_provider',
+    ),
+    'channel_coordinator': ('load_channel_history',),
+}
+
+_NAME_TO_MODULE = {
+    name: '.' + mod for mod, names in _SUBMOD_ATTRS.items() for name in names}
+
+
+def __getattr__(name):
+    module_path = _NAME_TO_MODULE.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    # PEP 562: __getattr__ only runs for names missing from the module dict.
+    # Binding the value here sends every later access (channel_history is
+    # read per message) through the normal lookup — do not remove.
+    globals()[name] = value
+    return value
+
+
+def preload():
+    """Import every lazy submodule now and bind its public names.
+
+    For entry points that import utils.history without touching its names
+    (scripts, tools). Not needed by bot.py: it and the command modules
+    resolve every lazy name at import time.
+
+    Blocking — call via asyncio.to_thread() from async code.
+    """
+    for mod, names in _SUBMOD_ATTRS.items():
+        module = importlib.import_module('.' + mod, __name__)
+        for name in names:
+            globals()[name] = getattr(module, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | _NAME_TO_MODULE.keys())
+
+
+__all__ = tuple(_NAME_TO_MODULE) + ('preload',)
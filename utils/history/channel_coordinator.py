@@ -1,8 +1,24 @@
 # utils/history/channel_coordinator.py
-# Version 2.1.0
+# Version 2.4.1
 """
 Channel coordination and locking management for Discord message history loading.
 
+CHANGES v2.4.1: A waiter whose load failed retries as the loader instead of
+  raising RuntimeError (same outcome as the old lock-then-recheck path)
+CHANGES v2.4.0: One-shot load gates replace the per-channel lock
+- MODIFIED: coordinate_channel_loading() — the first caller loads; concurrent
+  callers await its asyncio.Event gate (bounded by CHANNEL_LOCK_TIMEOUT) and
+  return when it is set, instead of queueing on a lock and re-checking
+- MODIFIED: waiters raise RuntimeError if the load they waited on failed
+  (the loader marks the channel only on success)
+- REMOVED: get_or_create_channel_lock usage; the post-acquire double check
+CHANGES v2.3.0: cleanup_fn parameter on coordinate_channel_loading()
+  (defaults to coordinate_final_cleanup) so callers can defer/replace cleanup
+CHANGES v2.2.x: asyncio.timeout() (Python 3.11+) instead of wait_for; channel
+  id/name passed to _execute_loading_workflow()
+CHANGES v2.1.1–v2.1.3: module-level cleanup import, time.time() loaded-at
+  stamps, %-style logging
+
 CHANGES v2.1.0: Add load_channel_history() public API (SOW v5.11.0)
 - ADDED: load_channel_history() — moved from loading.py (now deleted); thin
   wrapper around coordinate_channel_loading() that preserves the public API
@@ -14,11 +30,11 @@ CHANGES v2.0.0: Removed legacy settings restoration
 - ELIMINATED: Double-application of settings (prevention of redundancy)
 
 This module handles the high-level coordination of channel history loading,
-including concurrency control through channel-specific locking, basic validation,
+including concurrency control through per-channel load gates, basic validation,
 and delegation to specialized coordinators for different aspects of the loading process.
 
 Key Responsibilities:
-- Channel locking to prevent race conditions during loading
+- Per-channel load gates so each channel is loaded once at a time
 - High-level coordination of the loading workflow
 - Delegation to specialized coordinators for cleanup
 - Error handling and recovery for the overall process
@@ -28,14 +44,17 @@ Settings are now applied during Discord message discovery via realtime parsing,
 eliminating the need for post-loading restoration.
 """
 import asyncio
-import datetime
+import logging
+import time
 from config import CHANNEL_LOCK_TIMEOUT
 from utils.logging_utils import get_logger
 from .storage import (
-    get_or_create_channel_lock, is_channel_history_loaded, 
+    get_or_create_channel_load_gate, release_channel_load_gate,
+    is_channel_history_loaded,
     mark_channel_history_loaded
 )
 from .discord_loader import load_messages_from_discord
+from .cleanup_coordinator import coordinate_final_cleanup
 
 logger = get_logger('history.channel_coordinator')
 
@@ -51,86 +70,89 @@ async def load_channel_history(channel, is_automatic=False):
         channel: The Discord channel to load history from
         is_automatic: Whether this is an automatic load (triggered by new message)
     """
-    logger.debug(f"Public API load_channel_history called for channel #{channel.name}")
+    logger.debug("Public API load_channel_history called for channel #%s", channel.name)
     await coordinate_channel_loading(channel, is_automatic)
-    logger.debug(f"Public API load_channel_history completed for channel #{channel.name}")
+    logger.debug("Public API load_channel_history completed for channel #%s", channel.name)
 
 
-async def coordinate_channel_loading(channel, is_automatic=False):
+async def coordinate_channel_loading(channel, is_automatic=False, cleanup_fn=None):
     """
     Coordinate the complete channel history loading process with proper locking.
     
     This is the main coordination function that handles:
     1. Channel loading status validation
-    2. Concurrency control through channel-specific locking
+    2. Concurrency control through per-channel load gates
     3. Delegation to Discord loading with realtime settings parsing
     4. Final status marking and cleanup
     
     Args:
         channel: The Discord channel to load history from
         is_automatic: Whether this is an automatic load (triggered by new message)
+        cleanup_fn: Async callable run on the channel after loading;
+            defaults to coordinate_final_cleanup
         
     Returns:
         None
         
     Raises:
-        asyncio.TimeoutError: If unable to acquire channel lock within timeout
+        TimeoutError: If an in-progress load does not finish within timeout
         Exception: If any step of the loading process fails
     """
     channel_id = channel.id
     channel_name = channel.name
-    
-    logger.debug(f"coordinate_channel_loading called for channel #{channel_name} ({channel_id})")
-    logger.debug(f"Is channel in loaded_history_channels? {is_channel_history_loaded(channel_id)}")
-    logger.debug(f"Automatic loading: {is_automatic}")
-    
-    # Skip if we've already loaded history for this channel
-    if is_channel_history_loaded(channel_id):
-        logger.debug(f"Channel already in loaded_history_channels, returning early")
-        return
-    
-    # Get or create a lock for this channel to prevent race conditions
-    channel_lock = get_or_create_channel_lock(channel_id, channel_name)
-    
-    try:
-        logger.debug(f"Attempting to acquire lock for channel #{channel_name}")
-        
-        # Wait up to CHANNEL_LOCK_TIMEOUT seconds to acquire the lock
-        await asyncio.wait_for(channel_lock.acquire(), timeout=CHANNEL_LOCK_TIMEOUT)
-        
-        logger.debug(f"Successfully acquired lock for channel #{channel_name}")
-        
-        # Double check if history was loaded while we were waiting for the lock
+    if cleanup_fn is None:
+        cleanup_fn = coordinate_final_cleanup
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("coordinate_channel_loading called for channel #%s (%s)",
+                     channel_name, channel_id)
+        logger.debug("Is channel in loaded_history_channels? %s",
+                     is_channel_history_loaded(channel_id))
+        logger.debug("Automatic loading: %s", is_automatic)
+    
+    # One loader per channel; concurrent callers wait on its gate. If that
+    # load fails the channel stays unmarked and a waiter becomes the loader.
+    while True:
+        # Skip if we've already loaded history for this channel
         if is_channel_history_loaded(channel_id):
-            logger.debug(f"Channel was added to loaded_history_channels while waiting for lock, returning early")
+            logger.debug("Channel already in loaded_history_channels, returning early")
             return
         
+        gate, is_loader = get_or_create_channel_load_gate(channel_id, channel_name)
+        if is_loader:
+            break
+        
+        logger.debug("Load already in progress for channel #%s, waiting", channel_name)
         try:
-            # Perform the actual loading process using simplified workflow
-            await _execute_loading_workflow(channel, is_automatic)
-            
-            # Mark channel as loaded only after successful loading
-            timestamp = datetime.datetime.now()
-            mark_channel_history_loaded(channel_id, timestamp)
-            
-            logger.info(f"Successfully completed history loading for channel #{channel_name}")
-            
-        except Exception as e:
-            logger.error(f"Error in loading workflow: {str(e)}")
-            # We don't mark the channel as loaded if loading fails
+            # Wait up to CHANNEL_LOCK_TIMEOUT seconds for the in-flight load
+            async with asyncio.timeout(CHANNEL_LOCK_TIMEOUT):
+                await gate.wait()
+        except TimeoutError:
+            logger.warning("Timeout waiting for in-progress load on channel %s", channel_id)
+            logger.debug("Timeout after %s seconds waiting for load", CHANNEL_LOCK_TIMEOUT)
             raise
+    
+    try:
+        # Perform the actual loading process using simplified workflow
+        await _execute_loading_workflow(
+            channel, channel_id, channel_name, is_automatic, cleanup_fn)
+        
+        # Mark channel as loaded only after successful loading
+        mark_channel_history_loaded(channel_id, time.time())
         
-        finally:
-            # Always release the lock, even if loading fails
-            logger.debug(f"Releasing lock for channel #{channel_name}")
-            channel_lock.release()
-    
-    except asyncio.TimeoutError:
-        logger.warning(f"Timeout waiting for lock on channel {channel_id}")
-        logger.debug(f"Timeout after {CHANNEL_LOCK_TIMEOUT} seconds waiting for lock")
+        logger.info("Successfully completed history loading for channel #%s", channel_name)
+        
+    except Exception as e:
+        logger.error("Error in loading workflow: %s", e)
+        # We don't mark the channel as loaded if loading fails
         raise
+    
+    finally:
+        # Always wake waiters, even if loading fails
+        release_channel_load_gate(channel_id)
 
-async def _execute_loading_workflow(channel, is_automatic):
+async def _execute_loading_workflow(channel, channel_id, channel_name, is_automatic,
+                                    cleanup_fn):
     """
     Execute the simplified loading workflow with realtime settings parsing.
     
@@ -140,39 +162,38 @@ async def _execute_loading_workflow(channel, is_automatic):
     
     Args:
         channel: Discord channel object
+        channel_id: channel.id, already read by the caller
+        channel_name: channel.name, already read by the caller
         is_automatic: Whether this is automatic loading
+        cleanup_fn: Async cleanup callable (see coordinate_channel_loading)
         
     Raises:
         Exception: If any critical step of the loading process fails
     """
-    channel_id = channel.id
-    channel_name = channel.name
-    
-    logger.info(f"Starting simplified loading workflow for channel #{channel_name} ({channel_id})")
+    logger.info("Starting simplified loading workflow for channel #%s (%s)", channel_name, channel_id)
     
     # Step 1: Load messages from Discord API with realtime settings parsing
     # This handles: fetch → real-time settings parsing → message conversion
     try:
         processed_count, skipped_count = await load_messages_from_discord(channel, is_automatic)
-        logger.info(f"Discord loading complete: {processed_count} processed, {skipped_count} skipped")
+        logger.info("Discord loading complete: %d processed, %d skipped", processed_count, skipped_count)
         
     except Exception as e:
-        logger.error(f"Failed to load messages from Discord: {e}")
+        logger.error("Failed to load messages from Discord: %s", e)
         raise
     
     # Step 2: Final cleanup and validation (optional)
     try:
-        from .cleanup_coordinator import coordinate_final_cleanup
-        cleanup_result = await coordinate_final_cleanup(channel)
+        cleanup_result = await cleanup_fn(channel)
         
-        logger.debug(f"Final cleanup complete: {cleanup_result}")
+        logger.debug("Final cleanup complete: %s", cleanup_result)
         
     except Exception as e:
-        logger.error(f"Failed to complete final cleanup: {e}")
+        logger.error("Failed to complete final cleanup: %s", e)
         # Cleanup failure shouldn't stop history loading
         logger.warning("Continuing with history loading despite cleanup issues")
     
-    logger.info(f"Simplified loading workflow completed successfully for channel #{channel_name}")
+    logger.info("Simplified loading workflow completed successfully for channel #%s", channel_name)
 
 def validate_channel_for_loading(channel):
     """
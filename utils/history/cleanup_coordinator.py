@@ -1,8 +1,48 @@
 # utils/history/cleanup_coordinator.py
-# Version 2.2.0
+# Version 2.3.12
 """
 Final cleanup coordination for Discord message history loading.
 
+CHANGES v2.3.12: Sweep uses message_processing.is_history_output_cached, the
+  cache the converter and DB seed fill, instead of a private lru_cache
+
+CHANGES v2.3.11: Sweep's assistant-noise test goes through a bounded
+  lru_cache of is_history_output() (pure function of the content string)
+
+CHANGES v2.3.10: Sweep rewrites the channel's list in place (slice
+  assignment, or del of the unscanned head when nothing was filtered)
+  instead of rebinding channel_history[channel_id] to a new list
+CHANGES v2.3.9: No-op cleanups log at DEBUG; the per-load INFO summary is
+  emitted only when messages were filtered or trimmed (validation's own
+  "complete" line is DEBUG — the cleanup summary already carries the count)
+CHANGES v2.3.8: Message-shape sample runs only under __debug__ (compiled out
+  by python -O); count and missing-channel checks always run
+CHANGES v2.3.7: Sweep dispatches on role once (if/elif) so each message runs
+  only its role's test; an already-clean history is left in place
+CHANGES v2.3.6: coordinate_final_cleanup() builds its result dict once on
+  success instead of pre-filling and mutating it (it was never returned on error)
+CHANGES v2.3.5: _perform_final_validation() fetches the channel's history
+  once into a local instead of four lookups on channel_history
+CHANGES v2.3.4: _perform_final_validation() takes channel_id/channel_name
+  from coordinate_final_cleanup() rather than the channel object
+CHANGES v2.3.3: Final validation samples the first message only (no [:5]
+  slice); the sweep has already read role/content of every kept message
+CHANGES v2.3.2: Sweep binds its noise predicates and the prompt-update
+  prefix to locals once per call instead of global lookups per message
+CHANGES v2.3.1: _perform_final_validation() is a plain function (it never
+  awaited), so cleanup no longer allocates and schedules a coroutine for it
+
+CHANGES v2.3.0: Fused filter + trim
+- ADDED: _sweep_conversation_history() — one newest-first pass that filters
+  noise and stops at MAX_HISTORY kept messages
+- REMOVED: _filter_conversation_history(), _trim_to_max_history() (only
+  callers were coordinate_final_cleanup)
+- NOTE: messages_trimmed now counts older messages never scanned, so noise
+  outside the kept window is reported as trimmed rather than filtered
+
+CHANGES v2.2.1: %-style log arguments — messages are formatted only when a
+  handler emits them, not on every load under INFO
+
 CHANGES v2.2.0: Trim history to MAX_HISTORY after load (SOW v2.17.0)
 - ADDED: _trim_to_max_history() as Step 2 in coordinate_final_cleanup()
 - RESULT: channel_history never exceeds MAX_HISTORY messages after load;
@@ -37,19 +77,20 @@ All system prompt handling is done via realtime parsing during Discord loading.
 from config import MAX_HISTORY
 from utils.logging_utils import get_logger
 from .storage import channel_history
-from .message_processing import is_bot_command, is_history_output
+from .message_processing import is_bot_command, is_history_output_cached
 
 logger = get_logger('history.cleanup_coordinator')
 
+_PROMPT_UPDATE_PREFIX = "SYSTEM_PROMPT_UPDATE:"
+
 
 async def coordinate_final_cleanup(channel):
     """
     Coordinate final cleanup operations for a channel after history loading.
 
     Steps:
-    1. Filter unwanted messages (commands, noise, artifacts)
-    2. Trim to MAX_HISTORY most recent messages
-    3. Final validation and statistics
+    1. Filter unwanted messages and trim to MAX_HISTORY (single pass)
+    2. Final validation and statistics
 
     Args:
         channel: Discord channel object that was processed
@@ -60,182 +101,142 @@ async def coordinate_final_cleanup(channel):
     channel_id = channel.id
     channel_name = channel.name
 
-    logger.debug(f"Starting final cleanup coordination for channel #{channel_name}")
-
-    result = {
-        'messages_filtered': 0,
-        'messages_trimmed': 0,
-        'final_message_count': 0,
-        'cleanup_status': 'started'
-    }
+    logger.debug("Starting final cleanup coordination for channel #%s", channel_name)
 
     try:
-        # Step 1: Filter unwanted messages from conversation history
-        filter_result = await _filter_conversation_history(channel_id)
-        result['messages_filtered'] = filter_result['removed_count']
-
-        # Step 2: Trim to MAX_HISTORY
-        # Settings are already applied and noise is filtered — safe to trim now
-        trim_result = _trim_to_max_history(channel_id)
-        result['messages_trimmed'] = trim_result['removed_count']
+        # Step 1: Filter noise and trim to MAX_HISTORY
+        # Settings are already applied during loading — safe to trim now
+        filtered, trimmed = _sweep_conversation_history(channel_id)
 
-        # Step 3: Final validation and statistics
-        final_result = await _perform_final_validation(channel)
-        result['final_message_count'] = final_result['message_count']
+        # Step 2: Final validation and statistics
+        final_count = _perform_final_validation(channel_id, channel_name)['message_count']
 
-        result['cleanup_status'] = 'completed'
+        if filtered or trimmed:
+            logger.info("Final cleanup completed for channel #%s: "
+                        "%d filtered, %d trimmed to MAX_HISTORY=%d, %d final messages",
+                        channel_name, filtered, trimmed, MAX_HISTORY, final_count)
+        else:
+            logger.debug("Final cleanup for channel #%s: nothing removed, %d messages",
+                         channel_name, final_count)
 
-        logger.info(f"Final cleanup completed for channel #{channel_name}: "
-                    f"{result['messages_filtered']} filtered, "
-                    f"{result['messages_trimmed']} trimmed to MAX_HISTORY={MAX_HISTORY}, "
-                    f"{result['final_message_count']} final messages")
-
-        return result
+        return {
+            'messages_filtered': filtered,
+            'messages_trimmed': trimmed,
+            'final_message_count': final_count,
+            'cleanup_status': 'completed'
+        }
 
     except Exception as e:
-        logger.error(f"Error during final cleanup for channel #{channel_name}: {e}")
-        result['cleanup_status'] = f'error: {str(e)}'
+        logger.error("Error during final cleanup for channel #%s: %s", channel_name, e)
         raise
 
 
-async def _filter_conversation_history(channel_id):
+def _sweep_conversation_history(channel_id):
     """
-    Filter conversation history to remove unwanted messages.
+    Filter unwanted messages and trim to MAX_HISTORY in one pass.
 
-    Removes bot commands, history outputs, and system artifacts not needed
-    for AI context. Applies the same filtering logic as !history clean to
-    ensure automatic reload and manual reload produce identical results.
+    Walks history newest-first, dropping bot commands, history outputs, and
+    system artifacts not needed for AI context (the same rules as !history
+    clean), and stops once MAX_HISTORY messages are kept. A full-channel
+    fetch is therefore scanned only as far back as the kept window reaches,
+    instead of being filtered end to end and then mostly discarded.
 
     Args:
-        channel_id: Discord channel ID to filter
+        channel_id: Discord channel ID to clean
 
     Returns:
-        dict: Filter operation results with original/filtered/removed counts
+        tuple: (filtered_count, trimmed_count) — messages dropped as noise
+            within the scanned window, and older messages never scanned
     """
-    logger.debug(f"Filtering conversation history for channel {channel_id}")
-
-    if channel_id not in channel_history or not channel_history[channel_id]:
-        logger.debug(f"No history to filter for channel {channel_id}")
-        return {'original_count': 0, 'filtered_count': 0, 'removed_count': 0}
-
-    before_count = len(channel_history[channel_id])
-
-    channel_history[channel_id] = [
-        msg for msg in channel_history[channel_id]
-        if not (
-            msg["role"] == "user" and
-            is_bot_command(msg["content"])
-        ) and not (
-            msg["role"] == "assistant" and
-            is_history_output(msg["content"])
-        ) and not (
-            msg["role"] == "system" and
-            not msg["content"].startswith("SYSTEM_PROMPT_UPDATE:")
-        )
-    ]
-
-    after_count = len(channel_history[channel_id])
-    removed_count = before_count - after_count
-
-    if removed_count > 0:
-        logger.debug(f"Filtered {removed_count} unwanted messages from history")
-
-    return {
-        'original_count': before_count,
-        'filtered_count': after_count,
-        'removed_count': removed_count
-    }
-
-
-def _trim_to_max_history(channel_id):
-    """
-    Trim channel history to MAX_HISTORY most recent messages.
-
-    Called after settings parsing and noise filtering are complete, so no
-    settings data or relevant conversation context is lost by trimming.
-    After this point channel_history is always bounded to MAX_HISTORY,
-    and prepare_messages_for_api() can send all stored messages directly.
-
-    Args:
-        channel_id: Discord channel ID to trim
-
-    Returns:
-        dict: Trim operation results with original/final/removed counts
-    """
-    history = channel_history.get(channel_id, [])
+    history = channel_history.get(channel_id)
+    if not history:
+        logger.debug("No history to filter for channel %s", channel_id)
+        return 0, 0
+
+    # Locals for the per-message tests (fast lookups inside the loop)
+    is_command, is_output = is_bot_command, is_history_output_cached
+    prompt_prefix = _PROMPT_UPDATE_PREFIX
+    kept = []
+    scanned = 0
+    for msg in reversed(history):
+        if len(kept) >= MAX_HISTORY:
+            break
+        scanned += 1
+        role = msg["role"]
+        content = msg["content"]
+        if role == "user":
+            if is_command(content):
+                continue
+        elif role == "assistant":
+            if is_output(content):
+                continue
+        elif role == "system":
+            if not content.startswith(prompt_prefix):
+                continue
+        kept.append(msg)
+
+    filtered_count = scanned - len(kept)
     original_count = len(history)
-
-    if original_count <= MAX_HISTORY:
-        logger.debug(
-            f"No trim needed for channel {channel_id}: "
-            f"{original_count} messages <= MAX_HISTORY={MAX_HISTORY}"
+    trimmed_count = original_count - scanned
+    # Rewrite the stored list in place: references held elsewhere stay
+    # valid and dropped messages are released without a second full list
+    if filtered_count:
+        kept.reverse()
+        history[:] = kept
+    elif trimmed_count:
+        del history[:trimmed_count]
+    if trimmed_count:
+        logger.info(
+            "Trimmed channel %s history: %d → %d messages (MAX_HISTORY=%d)",
+            channel_id, original_count, len(history), MAX_HISTORY
         )
-        return {
-            'original_count': original_count,
-            'final_count': original_count,
-            'removed_count': 0
-        }
-
-    channel_history[channel_id] = history[-MAX_HISTORY:]
-    final_count = len(channel_history[channel_id])
-    removed_count = original_count - final_count
-
-    logger.info(
-        f"Trimmed channel {channel_id} history: "
-        f"{original_count} → {final_count} messages (MAX_HISTORY={MAX_HISTORY})"
-    )
+    return filtered_count, trimmed_count
 
-    return {
-        'original_count': original_count,
-        'final_count': final_count,
-        'removed_count': removed_count
-    }
 
-
-async def _perform_final_validation(channel):
+def _perform_final_validation(channel_id, channel_name):
     """
     Perform final validation and generate statistics for loaded history.
 
     Args:
-        channel: Discord channel object that was processed
+        channel_id: Discord channel ID that was processed
+        channel_name: Channel name for logging
 
     Returns:
         dict: Validation results with message count and any issues found
     """
-    channel_id = channel.id
-    channel_name = channel.name
+    logger.debug("Performing final validation for channel #%s", channel_name)
 
-    logger.debug(f"Performing final validation for channel #{channel_name}")
-
-    final_message_count = len(channel_history.get(channel_id, []))
+    messages = channel_history.get(channel_id)
+    final_message_count = len(messages) if messages is not None else 0
     validation_issues = []
 
     if final_message_count == 0:
         validation_issues.append("No messages in final history")
 
-    if channel_id not in channel_history:
+    if messages is None:
         validation_issues.append("Channel not found in channel_history")
-
-    if channel_id in channel_history:
-        for i, msg in enumerate(channel_history[channel_id][:5]):
-            if not isinstance(msg, dict):
-                validation_issues.append(f"Message {i} is not a dictionary")
-            elif 'role' not in msg:
-                validation_issues.append(f"Message {i} missing 'role' field")
-            elif 'content' not in msg:
-                validation_issues.append(f"Message {i} missing 'content' field")
+    elif __debug__ and final_message_count:
+        # One sample catches a systematically malformed load path; the
+        # sweep has already read role/content, so -O drops this check
+        first = messages[0]
+        if not isinstance(first, dict):
+            validation_issues.append("Message 0 is not a dictionary")
+        elif 'role' not in first:
+            validation_issues.append("Message 0 missing 'role' field")
+        elif 'content' not in first:
+            validation_issues.append("Message 0 missing 'content' field")
 
     if validation_issues:
         logger.warning(
-            f"Final validation found issues for channel #{channel_name}: "
-            f"{validation_issues}"
+            "Final validation found issues for channel #%s: %s",
+            channel_name, validation_issues
         )
     else:
-        logger.debug(f"Final validation passed for channel #{channel_name}")
+        logger.debug("Final validation passed for channel #%s", channel_name)
 
-    logger.info(
-        f"Final validation complete for channel #{channel_name}: "
-        f"{final_message_count} messages, {len(validation_issues)} issues"
+    logger.debug(
+        "Final validation complete for channel #%s: %d messages, %d issues",
+        channel_name, final_message_count, len(validation_issues)
     )
 
     return {
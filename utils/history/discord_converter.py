@@ -1,8 +1,37 @@
 # utils/history/discord_converter.py
-# Version 1.1.0
+# Version 1.3.7
 """
 Discord message conversion functionality for standardizing message format.
 
+CHANGES v1.3.7: Bot authorship compares message.author.id with the bot's ID
+  (bound once per call) instead of identity-then-__eq__ on Member objects
+
+CHANGES v1.3.5: convert_discord_messages() logs %-style and checks DEBUG once
+  per call; per-message debug lines (noise skips, progress) are skipped
+  entirely, content slices included, when DEBUG is off
+
+CHANGES v1.3.4: create_user_message() no longer gets len(messages) — its
+  history_length argument is unused (names are "display_name: content")
+
+CHANGES v1.3.3: Bot-author test tries identity with guild.me before __eq__;
+  count_convertible_messages() reads channel.guild.me once per call
+
+CHANGES v1.3.1: Bot-message noise test uses is_history_output_cached, so the
+  cleanup sweep's re-check of the same content is a cache hit
+
+CHANGES v1.3.0: Skip filtering fused into conversion
+- MODIFIED: convert_discord_messages() applies should_skip_message_from_history()
+  in its single pass (bot commands never reach history or the tokenizer) and
+  logs skip reasons alongside the noise count; this subsumes the !setprompt skip
+- REMOVED: filter_messages_for_conversion() (no callers; a separate filter
+  pass before conversion re-read every message)
+
+CHANGES v1.2.0: convert_discord_messages() collects converted messages and
+  stores them with one extend_history() call (batch tokenization)
+CHANGES v1.1.1: convert_discord_messages() binds channel.guild.me, the message
+  factories, add_message_to_history and len(messages) once per call, and reads
+  message.content once per message
+
 CHANGES v1.1.0: Pass msg_id to message creation for _msg_id dedup threading
 - MODIFIED: convert_discord_messages() — pass message.id to create_user_message()
   and create_assistant_message() so Layer 2 dedup can match against history IDs
@@ -22,11 +51,12 @@ filtering, and formatting logic for Discord-specific content.
 Extracted from discord_loader.py in refactoring to maintain 200-line limit.
 Part of the real-time settings parsing architecture preparation.
 """
+import logging
 from utils.logging_utils import get_logger
-from .storage import add_message_to_history
+from .storage import extend_history
 from .message_processing import (
     should_skip_message_from_history, create_user_message,
-    create_assistant_message, is_history_output
+    create_assistant_message, is_history_output_cached
 )
 
 logger = get_logger('history.discord_converter')
@@ -36,9 +66,11 @@ async def convert_discord_messages(channel, messages):
     """
     Convert a list of Discord message objects into standardized conversation history format.
 
-    Bot messages are filtered through is_history_output() before storage —
-    command confirmations and noise are excluded while settings persistence
-    messages pass through unaffected.
+    Filtering happens in the same pass: bot commands (should_skip_message_
+    from_history — !setprompt included, it is handled by the settings
+    parser) are dropped, and bot messages are filtered through
+    is_history_output() — command confirmations and noise are excluded
+    while settings persistence messages pass through unaffected.
 
     Args:
         channel: Discord channel object (for bot identity checking)
@@ -49,54 +81,69 @@ async def convert_discord_messages(channel, messages):
     """
     channel_id = channel.id
     channel_name = channel.name
-    converted_count = 0
+    converted = []
     noise_skipped = 0
-
-    logger.debug(f"Converting {len(messages)} Discord messages for channel #{channel_name}")
+    skip_summary = {}
+    total = len(messages)
+
+    # Loop-invariant lookups bound once: guild.me is a property that
+    # searches the member cache, and locals skip LOAD_GLOBAL per message.
+    # DM channels have no guild; their bot identity is channel.me.
+    # Authorship is an int compare on IDs, not Member.__eq__.
+    guild = getattr(channel, 'guild', None)
+    guild_me = guild.me if guild is not None else getattr(channel, 'me', None)
+    me_id = getattr(guild_me, 'id', None)
+    keep = converted.append
+    make_user, make_bot = create_user_message, create_assistant_message
+    is_noise = is_history_output_cached
+    should_skip = should_skip_message_from_history
+
+    # Checked once: the per-message debug lines cost nothing when DEBUG is off
+    debug = logger.isEnabledFor(logging.DEBUG)
+    logger.debug("Converting %d Discord messages for channel #%s", total, channel_name)
 
     for i, message in enumerate(messages):
+        content = message.content
         try:
-            # Skip setprompt commands since they're handled by settings parser
-            if message.content.startswith('!setprompt'):
-                logger.debug(f"Skipping setprompt command (handled by settings parser)")
+            author = message.author
+            is_bot_message = author.id == me_id
+            skip, skip_reason = should_skip(message, is_bot_message)
+            if skip:
+                skip_summary[skip_reason] = skip_summary.get(skip_reason, 0) + 1
                 continue
 
-            if message.author == channel.guild.me:
+            if is_bot_message:
                 # Bot message — filter noise before storing.
                 # Settings persistence messages ("Auto-response is now", etc.) are
                 # NOT matched by is_history_output() and will pass through correctly.
-                if is_history_output(message.content):
+                if is_noise(content):
                     noise_skipped += 1
-                    logger.debug(f"Skipping noise bot message: {message.content[:60]}...")
+                    if debug:
+                        logger.debug("Skipping noise bot message: %.60s...", content)
                     continue
-                bot_message = create_assistant_message(
-                    message.content, msg_id=message.id)
-                add_message_to_history(channel_id, bot_message)
-                converted_count += 1
+                keep(make_bot(content, msg_id=message.id))
 
             else:
                 # User message — convert to user format with proper naming
-                user_message = create_user_message(
-                    message.author.display_name,
-                    message.content,
-                    len(messages),
-                    msg_id=message.id
-                )
-                add_message_to_history(channel_id, user_message)
-                converted_count += 1
-
-            if (i + 1) % 10 == 0:
-                logger.debug(f"Converted {i + 1}/{len(messages)} messages")
+                keep(make_user(author.display_name, content, msg_id=message.id))
+
+            if debug and (i + 1) % 10 == 0:
+                logger.debug("Converted %d/%d messages", i + 1, total)
 
         except Exception as e:
-            logger.error(f"Error converting message {i+1}: {e}")
-            logger.debug(f"Problematic message content: {message.content[:100]}...")
+            logger.error("Error converting message %d: %s", i + 1, e)
+            logger.debug("Problematic message content: %.100s...", content)
             continue
 
+    extend_history(channel_id, converted)
+    converted_count = len(converted)
+
     logger.debug(
-        f"Message conversion complete for #{channel_name}: "
-        f"{converted_count} converted, {noise_skipped} noise messages skipped"
+        "Message conversion complete for #%s: %d converted, %d noise messages skipped",
+        channel_name, converted_count, noise_skipped
     )
+    if skip_summary:
+        logger.debug("Skip reasons: %s", skip_summary)
 
     return converted_count
 
@@ -115,9 +162,10 @@ def count_convertible_messages(messages, channel):
     convertible_count = 0
     skip_count = 0
     skip_reasons = {}
+    me_id = channel.guild.me.id
 
     for message in messages:
-        is_bot_message = message.author == channel.guild.me
+        is_bot_message = message.author.id == me_id
         should_skip, skip_reason = should_skip_message_from_history(message, is_bot_message)
 
         if should_skip:
@@ -129,41 +177,6 @@ def count_convertible_messages(messages, channel):
     return convertible_count, skip_count, skip_reasons
 
 
-def filter_messages_for_conversion(messages, channel):
-    """
-    Filter Discord messages to remove those that should be skipped during conversion.
-
-    Args:
-        messages: List of Discord message objects
-        channel: Discord channel object (for bot identity checking)
-
-    Returns:
-        tuple: (filtered_messages, skipped_count, skip_summary)
-    """
-    filtered_messages = []
-    skipped_count = 0
-    skip_summary = {}
-
-    for message in messages:
-        is_bot_message = message.author == channel.guild.me
-        should_skip, skip_reason = should_skip_message_from_history(message, is_bot_message)
-
-        if should_skip:
-            skipped_count += 1
-            skip_summary[skip_reason] = skip_summary.get(skip_reason, 0) + 1
-            logger.debug(f"Filtering out message ({skip_reason}): {message.content[:30]}...")
-        else:
-            filtered_messages.append(message)
-
-    logger.debug(
-        f"Message filtering complete: {len(filtered_messages)} kept, {skipped_count} filtered"
-    )
-    if skip_summary:
-        logger.debug(f"Skip reasons: {skip_summary}")
-
-    return filtered_messages, skipped_count, skip_summary
-
-
 def validate_discord_message(message):
     """
     Validate that a Discord message object has the required attributes for conversion.
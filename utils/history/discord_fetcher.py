@@ -1,8 +1,11 @@
 # utils/history/discord_fetcher.py
-# Version 1.3.0
+# Version 1.3.1
 """
 Discord API interaction functionality for fetching messages.
 
+CHANGES v1.3.1: Full fetch appends and reverses once instead of
+  messages.insert(0, ...) per message — O(n) rather than O(n²)
+
 CHANGES v1.3.0: Delta fetch — accept after_id to fetch only messages newer than
   the last DB-recorded ID; add import discord
 CHANGES v1.2.0: Dead code cleanup (SOW v2.16.0)
@@ -71,7 +74,10 @@ async def fetch_messages_from_discord(channel, is_automatic, after_id=None):
             skipped_count += 1
             logger.debug("Skipping newest message to avoid duplicate during automatic loading")
             continue
-        messages.insert(0, message)
+        messages.append(message)
+    # Discord yields newest-first; one reverse restores chronological order
+    # (insert(0, ...) per message made the full fetch quadratic)
+    messages.reverse()
 
     logger.info(
         f"Full fetch complete: {message_count} total, "
@@ -1,8 +1,13 @@
 # utils/history/discord_loader.py
-# Version 2.4.0
+# Version 2.4.2
 """
 Discord API interaction coordination for message history loading.
 
+CHANGES v2.4.2: DB seed noise check uses is_history_output_cached
+
+CHANGES v2.4.1: _seed_history_from_db() stores the seeded window with one
+  extend_history() call and slices it once
+
 CHANGES v2.4.0: Pass msg.id to create_*_message() in _seed_history_from_db()
   so seeded history entries carry _msg_id for Layer 2 deduplication
 
@@ -27,10 +32,10 @@ from config import MAX_HISTORY
 from .discord_fetcher import fetch_messages_from_discord
 from .discord_converter import convert_discord_messages, count_convertible_messages
 from .realtime_settings_parser import parse_settings_during_load, restore_settings_from_db
-from .storage import add_message_to_history
+from .storage import extend_history
 from .message_processing import (
     create_user_message, create_assistant_message,
-    is_history_output, is_settings_persistence_message,
+    is_history_output_cached, is_settings_persistence_message,
 )
 
 logger = get_logger('history.discord_loader')
@@ -59,15 +64,15 @@ def _seed_history_from_db(channel_id):
         if content.startswith('!'):
             continue
         if msg.is_bot_author:
-            if is_history_output(content) or is_settings_persistence_message(content):
+            if is_history_output_cached(content) or is_settings_persistence_message(content):
                 continue
             kept.append(create_assistant_message(content, msg_id=msg.id))
         else:
             kept.append(create_user_message(msg.author_name, content, msg_id=msg.id))
     # Take only the last MAX_HISTORY after filtering
-    for entry in kept[-MAX_HISTORY:]:
-        add_message_to_history(channel_id, entry)
-    return len(kept[-MAX_HISTORY:])
+    recent = kept[-MAX_HISTORY:]
+    extend_history(channel_id, recent)
+    return len(recent)
 
 
 async def load_messages_from_discord(channel, is_automatic):
@@ -1,35 +1,40 @@
 # utils/history/message_processing.py
-# Version 2.4.0
+# Version 2.5.4
 """
 Message processing and filtering for Discord bot history.
 
-CHANGES v2.4.0: Thread _msg_id through message creation and API prep
-- MODIFIED: create_user_message(), create_assistant_message(),
-  format_user_message_for_history() — accept optional msg_id kwarg;
-  include _msg_id in returned dict when provided
-- MODIFIED: prepare_messages_for_api() — pass through _msg_id from
-  channel_history so Layer 2 dedup in context_manager can match IDs
-
-CHANGES v2.3.0: Prefix-based filtering replaces pattern matching
-- ADDED: is_noise_message() — checks for ℹ️ prefix (command output, display)
-- ADDED: is_settings_message() — checks for ⚙️ prefix (persistent settings)
-- ADDED: is_admin_output() — either prefix (filters from API and summarizer)
-- RETAINED: is_history_output() — now delegates to prefix checks + legacy
-  patterns for backward compatibility with pre-prefix messages in history
-- RETAINED: is_settings_persistence_message() — now delegates to prefix check
-  + legacy patterns for backward compat
-- RETAINED: is_summary_output() — now delegates to prefix check + legacy
-- RETAINED: All other functions unchanged
-
-The ℹ️/⚙️ prefix system replaces the growing list of string patterns.
-New commands only need to prepend the right emoji. Legacy patterns remain
-for messages already stored in SQLite/Discord history without prefixes.
+CHANGES v2.5.4: Legacy startswith() patterns in is_history_output() and
+  is_summary_output() collapsed into prefix tuples (one call each)
 
+CHANGES v2.5.3: History lookups default to () so a miss allocates no list
+CHANGES v2.5.2: is_history_output_cached — bounded lru_cache over
+  is_history_output() shared by the load paths (convert, seed, sweep)
+
+CHANGES v2.5.1: is_bot_command() tests its '!' and '/' prefixes with one
+  tuple startswith() call
+
+CHANGES v2.5.0: Filter each history entry once, not on every API call
+- ADDED: _is_api_message() — role + noise + settings check for one entry
+- MODIFIED: prepare_messages_for_api() memoizes the verdict on the stored
+  entry as "_api_ok"; later calls skip the string-pattern filters entirely.
+  History entries are never edited in place, so the verdict cannot go stale.
+
+CHANGES v2.4.1: prepare_messages_for_api() passes through write-time "_tokens"
+
+CHANGES v2.4.0: Thread _msg_id through message creation (optional msg_id
+  kwarg) and prepare_messages_for_api() for Layer 2 dedup in context_manager
+
+CHANGES v2.3.0: Prefix-based filtering replaces pattern matching — ℹ️
+  (is_noise_message) and ⚙️ (is_settings_message) prefixes, is_admin_output()
+  for either; the is_*_output/persistence checks keep legacy patterns for
+  pre-prefix messages already stored in SQLite/Discord history. New commands
+  only need to prepend the right emoji.
 CHANGES v2.2.7: Add is_summary_output()
 CHANGES v2.2.6: Add DEEPSEEK_REASONING noise pattern
 CHANGES v2.2.5: Filter settings persistence messages from API payload
 CHANGES v2.2.4: Add API error message filter pattern
 """
+from functools import lru_cache
 from config import HISTORY_LINE_PREFIX
 from utils.logging_utils import get_logger
 from .storage import channel_history
@@ -67,13 +72,26 @@ def is_admin_output(content):
 
 # --- Legacy filters (backward compat for pre-prefix messages) ---
 
+# Anchored legacy patterns, each tested with one tuple startswith() call
+# (one C-level scan instead of a Python-level call per prefix)
+_LEGACY_NOISE_PREFIXES = (REASONING_PREFIX, API_ERROR_PREFIX,
+                          "**1.", "**2.", "```\n!")
+_LEGACY_SUMMARY_PREFIXES = (
+    "**Summary for #", "**Summary updated for #",
+    "No new messages to summarize", "Summarization failed:",
+    "Error running summarization:", "Summary cleared for #",
+    "No summary found for #", "No summary available for #",
+    "Error retrieving summary:", "Error clearing summary:",
+    "**Raw Minutes for #", "**Full Summary for #", "OVERVIEW",
+)
+
+
 def is_bot_command(message_text):
     """Return True if message is a bot command (except !prompt)."""
     if message_text.startswith('!prompt'):
         return False
-    return (message_text.startswith('!') or
-            ': !' in message_text or
-            message_text.startswith('/'))
+    return (message_text.startswith(('!', '/')) or
+            ': !' in message_text)
 
 
 def is_history_output(message_text):
@@ -97,16 +115,12 @@ def is_history_output(message_text):
 
     # Legacy patterns for pre-prefix messages
     return (
-        message_text.startswith(REASONING_PREFIX) or
-        message_text.startswith(API_ERROR_PREFIX) or
+        message_text.startswith(_LEGACY_NOISE_PREFIXES) or
         "**Conversation History**" in message_text or
         HISTORY_LINE_PREFIX in message_text or
-        message_text.startswith("**1.") or
-        message_text.startswith("**2.") or
         (("Loaded " in message_text) and
          (" messages from channel history" in message_text)) or
         "Cleaned history: removed " in message_text or
-        message_text.startswith("```\n!") or
         "**Bot Status for" in message_text or
         "Usage: !history" in message_text or
         "Options: on, off" in message_text or
@@ -128,26 +142,17 @@ def is_history_output(message_text):
     )
 
 
+# The same bot replies are classified by the converter, the DB seed and the
+# cleanup sweep on every reload; the verdict depends only on the text.
+is_history_output_cached = lru_cache(maxsize=2048)(is_history_output)
+
+
 def is_summary_output(message_text):
     """Return True if message is output from a !summary command."""
     if is_noise_message(message_text):
         return True
     # Legacy patterns
-    return (
-        message_text.startswith("**Summary for #") or
-        message_text.startswith("**Summary updated for #") or
-        message_text.startswith("No new messages to summarize") or
-        message_text.startswith("Summarization failed:") or
-        message_text.startswith("Error running summarization:") or
-        message_text.startswith("Summary cleared for #") or
-        message_text.startswith("No summary found for #") or
-        message_text.startswith("No summary available for #") or
-        message_text.startswith("Error retrieving summary:") or
-        message_text.startswith("Error clearing summary:") or
-        message_text.startswith("**Raw Minutes for #") or
-        message_text.startswith("**Full Summary for #") or
-        message_text.startswith("OVERVIEW")
-    )
+    return message_text.startswith(_LEGACY_SUMMARY_PREFIXES)
 
 
 def is_settings_persistence_message(message_text):
@@ -202,23 +207,32 @@ def create_system_update_message(content):
     return {"role": "system", "content": content}
 
 
+def _is_api_message(msg):
+    """True if a history entry belongs in the API payload."""
+    if msg["role"] not in ("user", "assistant"):
+        return False
+    content = msg["content"]
+    return not (is_history_output(content) or
+                is_settings_persistence_message(content))
+
+
 def prepare_messages_for_api(channel_id):
     """Prepare messages for API submission, filtering admin output."""
     system_prompt = get_system_prompt(channel_id)
     messages = [{"role": "system", "content": system_prompt}]
 
-    history = channel_history.get(channel_id, [])
+    history = channel_history.get(channel_id, ())
     for msg in history:
-        if msg["role"] not in ("user", "assistant"):
-            continue
-        content = msg["content"]
-        if is_history_output(content):
-            continue
-        if is_settings_persistence_message(content):
+        ok = msg.get("_api_ok")
+        if ok is None:
+            ok = msg["_api_ok"] = _is_api_message(msg)
+        if not ok:
             continue
-        entry = {"role": msg["role"], "content": content}
+        entry = {"role": msg["role"], "content": msg["content"]}
         if "_msg_id" in msg:
             entry["_msg_id"] = msg["_msg_id"]
+        if "_tokens" in msg:
+            entry["_tokens"] = msg["_tokens"]
         messages.append(entry)
 
     return messages
@@ -227,7 +241,7 @@ def prepare_messages_for_api(channel_id):
 def extract_system_prompt_updates(channel_id):
     """Extract SYSTEM_PROMPT_UPDATE records from channel_history."""
     updates = []
-    history = channel_history.get(channel_id, [])
+    history = channel_history.get(channel_id, ())
     for msg in history:
         if (msg["role"] == "system" and
                 msg.get("content", "").startswith("SYSTEM_PROMPT_UPDATE:")):
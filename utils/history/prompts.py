@@ -1,13 +1,25 @@
+# utils/history/prompts.py
+# Version 1.1.0
 """
 System prompt and AI provider management for Discord bot.
+
+CHANGES v1.1.0: Cached system-prompt token count
+- ADDED: channel_system_prompt_tokens, get_system_prompt_tokens() — count
+  computed once per prompt instead of on every context build
+- MODIFIED: set_system_prompt() stores the count alongside the prompt
 """
 import datetime
 from config import DEFAULT_SYSTEM_PROMPT
 from utils.logging_utils import get_logger
+from utils.token_counter import estimate_tokens, MSG_OVERHEAD
 from .storage import channel_system_prompts, channel_ai_providers, add_message_to_history, channel_history
 
 logger = get_logger('history.prompts')
 
+# {channel_id: (prompt, tokens)} — prompt kept so writes that bypass
+# set_system_prompt() (settings restore) are detected and recounted.
+channel_system_prompt_tokens = {}
+
 def get_system_prompt(channel_id):
     """
     Get the system prompt for a channel, falling back to default if none is set
@@ -22,6 +34,24 @@ def get_system_prompt(channel_id):
     logger.debug(f"get_system_prompt for channel {channel_id}: {'custom prompt' if channel_id in channel_system_prompts else 'default prompt'}")
     return prompt
 
+def get_system_prompt_tokens(channel_id, prompt):
+    """
+    Get the token count (including MSG_OVERHEAD) of a channel's system prompt
+    
+    Args:
+        channel_id: The Discord channel ID
+        prompt: The prompt text actually being sent
+        
+    Returns:
+        int: Cached count if it matches prompt, otherwise freshly computed
+    """
+    cached = channel_system_prompt_tokens.get(channel_id)
+    if cached is not None and cached[0] == prompt:
+        return cached[1]
+    tokens = estimate_tokens(prompt) + MSG_OVERHEAD
+    channel_system_prompt_tokens[channel_id] = (prompt, tokens)
+    return tokens
+
 def set_system_prompt(channel_id, new_prompt):
     """
     Set a custom system prompt for a channel and record it in history
@@ -43,6 +73,8 @@ def set_system_prompt(channel_id, new_prompt):
         
     # Store the prompt in the dictionary
     channel_system_prompts[channel_id] = new_prompt
+    channel_system_prompt_tokens[channel_id] = (
+        new_prompt, estimate_tokens(new_prompt) + MSG_OVERHEAD)
     
     logger.debug(f"Updated prompt in channel_system_prompts dictionary")
     logger.debug(f"channel_system_prompts now has {len(channel_system_prompts)} entries")
@@ -131,6 +163,7 @@ def remove_system_prompt(channel_id):
         str or None: The prompt that was removed, or None if none was set
     """
     removed_prompt = channel_system_prompts.pop(channel_id, None)
+    channel_system_prompt_tokens.pop(channel_id, None)
     if removed_prompt:
         logger.debug(f"Removed custom system prompt for channel {channel_id}")
         
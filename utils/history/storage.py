@@ -1,10 +1,37 @@
+# utils/history/storage.py
+# Version 1.3.2
 """
 Storage management for Discord bot history data.
 Handles all the data dictionaries and basic access operations.
+
+CHANGES v1.3.2: Write-time token stamping never raises — on a tokenizer
+  error the message is stored without "_tokens" and counted at build time
+
+CHANGES v1.3.1: extend_history() docstring notes its worker-thread caller
+
+CHANGES v1.3.0: extend_history() — bulk add for history loads; one batch
+  tokenizer call and one list extend instead of per-message appends
+
+CHANGES v1.2.1: trim_channel_history() deletes the head slice in place
+  (del history[:-max_length]) instead of copying the tail to a new list
+
+CHANGES v1.2.0: Per-channel load gates
+- ADDED: channel_load_gates, get_or_create_channel_load_gate(),
+  release_channel_load_gate() — an asyncio.Event per in-flight history load
+- REMOVED: channel_locks, get_or_create_channel_lock() (no remaining callers)
+
+CHANGES v1.1.1: loaded_history_channels values are time.time() floats
+  (datetime.fromtimestamp() where a readable form is needed)
+
+CHANGES v1.1.0: Write-time token accounting
+- MODIFIED: add_message_to_history() stamps each message with "_tokens"
+  (content tokens + MSG_OVERHEAD) so context building never re-tokenizes
+  stored history at request time
 """
 from collections import defaultdict
 import asyncio
 from utils.logging_utils import get_logger
+from utils.token_counter import count_message_tokens, prime_message_tokens
 
 logger = get_logger('history.storage')
 
@@ -12,11 +39,12 @@ logger = get_logger('history.storage')
 channel_history = defaultdict(list)
 
 # Dictionary to track channels where history has been loaded, with timestamps
-# Format: {channel_id: first_processed_timestamp}
+# Format: {channel_id: loaded_at_epoch_seconds}
 loaded_history_channels = {}
 
-# Dictionary to store locks for each channel
-channel_locks = {}
+# Dictionary of in-flight history loads: {channel_id: asyncio.Event}
+# An entry exists only while a load runs; concurrent callers await its event.
+channel_load_gates = {}
 
 # Dictionary to store custom system prompts for each channel
 # Format: {channel_id: custom_prompt}
@@ -26,25 +54,39 @@ channel_system_prompts = {}
 # Format: {channel_id: provider_name}
 channel_ai_providers = {}
 
-def get_or_create_channel_lock(channel_id, channel_name=None):
+def get_or_create_channel_load_gate(channel_id, channel_name=None):
     """
-    Get or create a lock for a channel
+    Get the in-flight load gate for a channel, creating it if none exists
     
     Args:
         channel_id: The Discord channel ID
         channel_name: Optional channel name for logging
         
     Returns:
-        asyncio.Lock: The lock for this channel
-    """
-    if channel_id not in channel_locks:
-        channel_locks[channel_id] = asyncio.Lock()
-        if channel_name:
-            logger.debug(f"Created new lock for channel #{channel_name}")
-        else:
-            logger.debug(f"Created new lock for channel {channel_id}")
+        tuple: (gate, created) — created is True when the caller is now
+            the loader and must call release_channel_load_gate()
+    """
+    gate = channel_load_gates.get(channel_id)
+    if gate is not None:
+        return gate, False
+    
+    gate = channel_load_gates[channel_id] = asyncio.Event()
+    if channel_name:
+        logger.debug("Created load gate for channel #%s", channel_name)
+    else:
+        logger.debug("Created load gate for channel %s", channel_id)
+    return gate, True
+
+def release_channel_load_gate(channel_id):
+    """
+    Remove a channel's load gate and wake everything waiting on it
     
-    return channel_locks[channel_id]
+    Args:
+        channel_id: The Discord channel ID
+    """
+    gate = channel_load_gates.pop(channel_id, None)
+    if gate is not None:
+        gate.set()
 
 def is_channel_history_loaded(channel_id):
     """
@@ -64,7 +106,7 @@ def mark_channel_history_loaded(channel_id, timestamp):
     
     Args:
         channel_id: The Discord channel ID  
-        timestamp: When the history was loaded
+        timestamp: When the history was loaded (time.time() float)
     """
     loaded_history_channels[channel_id] = timestamp
     logger.debug(f"Marked channel {channel_id} as history loaded")
@@ -81,16 +123,51 @@ def get_channel_history(channel_id):
     """
     return channel_history[channel_id]
 
+def _stamp_tokens(message):
+    """
+    Stamp "_tokens" on a message, leaving it unset if counting fails
+    
+    The write path must never lose a message to a tokenizer error;
+    count_message_tokens() counts unstamped entries at context build time.
+    """
+    try:
+        message["_tokens"] = count_message_tokens(message)
+    except Exception as e:
+        logger.warning("Token count failed, storing message unstamped: %s", e)
+
 def add_message_to_history(channel_id, message):
     """
     Add a message to channel history
     
     Args:
         channel_id: The Discord channel ID
-        message: Message dict with role, content, etc.
+        message: Message dict with role, content, etc. Gains a "_tokens"
+            key holding its turn token count (unset if counting fails).
     """
+    _stamp_tokens(message)
     channel_history[channel_id].append(message)
 
+def extend_history(channel_id, messages):
+    """
+    Add several messages to channel history with one list extend
+    
+    Tokenizes the batch in a single encoder call (prime_message_tokens)
+    before stamping each message's "_tokens", as add_message_to_history does.
+    Also called from asyncio.to_thread (_seed_history_from_db): the token
+    caches are lock-guarded and the append is a single list.extend().
+    
+    Args:
+        channel_id: The Discord channel ID
+        messages: List of message dicts, oldest first
+    """
+    try:
+        prime_message_tokens(messages)
+    except Exception as e:
+        logger.warning("Batch token count failed, counting per message: %s", e)
+    for message in messages:
+        _stamp_tokens(message)
+    channel_history[channel_id].extend(messages)
+
 def trim_channel_history(channel_id, max_length):
     """
     Trim channel history to maximum length
@@ -102,11 +179,11 @@ def trim_channel_history(channel_id, max_length):
     Returns:
         tuple: (old_length, new_length) for logging
     """
-    old_length = len(channel_history[channel_id])
+    history = channel_history[channel_id]
+    old_length = len(history)
     if old_length > max_length:
-        channel_history[channel_id] = channel_history[channel_id][-max_length:]
-        new_length = len(channel_history[channel_id])
-        return old_length, new_length
+        del history[:-max_length]
+        return old_length, len(history)
     return old_length, old_length
 
 def clear_channel_history(channel_id):
@@ -1,8 +1,11 @@
 # utils/response_handler.py
-# Version 1.5.0
+# Version 1.5.1
 """
 AI response handling utilities for Discord bot.
 
+CHANGES v1.5.1: add_response_to_history() stores via add_message_to_history()
+  so assistant turns carry write-time "_tokens" counts
+
 CHANGES v1.5.0: Thread _msg_id through bot responses for Layer 2 dedup
 - MODIFIED: add_response_to_history() — accept msg_id=None kwarg; include
   _msg_id in stored dict when provided
@@ -34,6 +37,7 @@ import discord
 from utils.ai_utils import generate_ai_response
 from utils.message_utils import split_message, create_history_content_for_bot_response
 from utils.history import channel_history
+from utils.history.storage import add_message_to_history
 from utils.history.message_processing import is_history_output
 from utils.logging_utils import get_logger
 from config import MAX_HISTORY
@@ -211,10 +215,12 @@ def add_response_to_history(channel_id, text_content, images_count=0, msg_id=Non
     entry = {"role": "assistant", "content": history_content}
     if msg_id is not None:
         entry["_msg_id"] = msg_id
-    channel_history[channel_id].append(entry)
+    add_message_to_history(channel_id, entry)
 
     # Trim to MAX_HISTORY to prevent temporary overshoot between
     # user append (in bot.py) and assistant append (here)
+    # Rebind, not del: a context build in a worker thread may
+    # still be iterating the old list
     if len(channel_history[channel_id]) > MAX_HISTORY:
         channel_history[channel_id] = channel_history[channel_id][-MAX_HISTORY:]
         logger.debug(f"Trimmed history to {MAX_HISTORY} after assistant append for channel {channel_id}")
@@ -0,0 +1,249 @@
+# utils/token_counter.py
+# Version 1.6.3
+"""
+Token counting for context assembly.
+Extracted from context_manager.py to respect the 250-line limit.
+
+CHANGES v1.6.3: _get_encoding() skips a backend whose loader raises anything,
+  not just ImportError, so a broken install cannot make every count retry
+
+CHANGES v1.6.1–v1.6.2: _cache_lock guards both caches (event loop and
+  asyncio.to_thread workers); eviction tolerates an already-removed key
+
+CHANGES v1.6.0: warmup() — load the encoder at startup (called from on_ready)
+  so the first user request does not pay the BPE-rank load
+
+CHANGES v1.5.0: Content-keyed LRU in estimate_tokens()
+- ADDED: _content_token_cache — repeated texts ("ok", command echoes, settings
+  boilerplate) are encoded once; only texts up to _CONTENT_CACHE_MAX_CHARS
+- MODIFIED: prime_message_tokens() serves content hits without encoding and
+  records batch results in the content cache
+
+CHANGES v1.4.0: Honor write-time "_tokens" stamped by add_message_to_history()
+
+CHANGES v1.3.0: Pluggable tokenizer backend (TOKENIZER_BACKEND) — riptoken,
+  tokendagger, rs_bpe, then tiktoken; _OrdinaryAdapter for encode()-only ones
+CHANGES v1.2.0: _encode_len() — long texts encoded in whitespace-aligned
+  chunks (BPE merging is super-linear on long unbroken input)
+
+CHANGES v1.1.0: prime_message_tokens() — one encode_ordinary_batch() call
+  for uncached messages; estimate_tokens() uses encode_ordinary() to match
+
+CREATED v1.0.0:
+- _get_encoding(), estimate_tokens(), MSG_OVERHEAD — moved from context_manager
+  (still re-exported there for existing importers)
+- count_message_tokens() — per-message turn count cached by Discord message ID
+  so unchanged messages are tokenized once instead of on every API call
+"""
+import os
+import threading
+from collections import OrderedDict
+from importlib import import_module
+from config import TOKENIZER_BACKEND
+from utils.logging_utils import get_logger
+
+logger = get_logger('token_counter')
+
+MSG_OVERHEAD = 4
+
+_encoding = None
+_encoding_loaded = False
+
+# The caches below are used from the event loop (add_message_to_history) and
+# from asyncio.to_thread workers (context build, DB seed). The encoder
+# releases the GIL, so every read-modify-write holds _cache_lock.
+_cache_lock = threading.Lock()
+
+# {discord_message_id: (content, tokens)} — content kept to detect edits.
+# Bounded FIFO: oldest entry evicted once the cap is reached.
+_MSG_TOKEN_CACHE_MAX = 4096
+_msg_token_cache = {}
+
+# {text: tokens} LRU for short texts, shared across messages and channels.
+_CONTENT_CACHE_MAX = 8192
+_CONTENT_CACHE_MAX_CHARS = 1024
+_content_token_cache = OrderedDict()
+
+_BATCH_THREADS = min(8, os.cpu_count() or 1)
+
+# Longer texts are split (at a newline/space where possible) before encoding
+# so worst-case cost stays linear in input length.
+_ENCODE_CHUNK_CHARS = 8192
+
+
+class _OrdinaryAdapter:
+    """Expose encode_ordinary() on encoders that only provide encode()."""
+
+    def __init__(self, enc):
+        self.encode_ordinary = enc.encode
+
+
+def _load_tiktoken_compatible(module_name):
+    return import_module(module_name).get_encoding("cl100k_base")
+
+
+def _load_rs_bpe():
+    from rs_bpe.bpe import openai
+    return openai.cl100k_base()
+
+
+_BACKENDS = {
+    "riptoken": lambda: _load_tiktoken_compatible("riptoken"),
+    "tokendagger": lambda: _load_tiktoken_compatible("tokendagger"),
+    "rs_bpe": _load_rs_bpe,
+    "tiktoken": lambda: _load_tiktoken_compatible("tiktoken"),
+}
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        names = list(_BACKENDS) if TOKENIZER_BACKEND == "auto" else [TOKENIZER_BACKEND]
+        for name in names:
+            loader = _BACKENDS.get(name)
+            if loader is None:
+                logger.warning(f"Unknown TOKENIZER_BACKEND '{name}'")
+                continue
+            try:
+                enc = loader()
+            except ImportError:
+                continue
+            except Exception as e:
+                # Installed but unusable (incompatible API, failed
+                # cl100k download): try the next backend
+                logger.warning(f"Tokenizer backend '{name}' failed to load: {e}")
+                continue
+            if not hasattr(enc, "encode_ordinary"):
+                enc = _OrdinaryAdapter(enc)
+            _encoding = enc
+            logger.info(f"Tokenizer backend: {name}")
+            break
+        else:
+            logger.warning("No usable tokenizer backend — using character estimate")
+        _encoding_loaded = True
+    return _encoding
+
+
+def warmup():
+    """Load the tokenizer backend and run one throwaway encode.
+
+    Blocking — call via asyncio.to_thread() from async code.
+    """
+    enc = _get_encoding()
+    if enc is not None:
+        enc.encode_ordinary("warm")
+
+
+def estimate_tokens(text):
+    """Estimate token count. Uses the tokenizer backend if available, else len/3.2."""
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is None:
+        return int(len(text) / 3.2)
+    if len(text) > _CONTENT_CACHE_MAX_CHARS:
+        return _encode_len(enc, text)
+    with _cache_lock:
+        tokens = _content_token_cache.get(text)
+        if tokens is not None:
+            _content_token_cache.move_to_end(text)
+            return tokens
+    tokens = len(enc.encode_ordinary(text))
+    _content_put(text, tokens)
+    return tokens
+
+
+def _content_put(text, tokens):
+    with _cache_lock:
+        _content_token_cache[text] = tokens
+        _content_token_cache.move_to_end(text)
+        if len(_content_token_cache) > _CONTENT_CACHE_MAX:
+            _content_token_cache.popitem(last=False)
+
+
+def _encode_len(enc, text):
+    """Token count of text, encoding in bounded chunks when it is long."""
+    n = len(text)
+    if n <= _ENCODE_CHUNK_CHARS:
+        return len(enc.encode_ordinary(text))
+    total, start = 0, 0
+    while start < n:
+        end = min(start + _ENCODE_CHUNK_CHARS, n)
+        if end < n:
+            cut = max(text.rfind("\n", start, end), text.rfind(" ", start, end))
+            if cut > start:
+                end = cut
+        total += len(enc.encode_ordinary(text[start:end]))
+        start = end
+    return total
+
+
+def _cache_key(msg):
+    return msg.get("_msg_id") or msg.get("id")
+
+
+def _cache_put(key, content, tokens):
+    with _cache_lock:
+        if len(_msg_token_cache) >= _MSG_TOKEN_CACHE_MAX:
+            _msg_token_cache.pop(next(iter(_msg_token_cache), None), None)
+        _msg_token_cache[key] = (content, tokens)
+
+
+def count_message_tokens(msg):
+    """Token count for one message turn (content + MSG_OVERHEAD).
+
+    Uses the "_tokens" value stamped at write time when present; otherwise
+    cached by Discord message ID (_msg_id on history entries, id on DB rows).
+    The cached content is compared on hit so edited messages are recounted.
+    Entries without an ID are counted directly.
+    """
+    tokens = msg.get("_tokens")
+    if tokens is not None:
+        return tokens
+    content = msg["content"]
+    key = _cache_key(msg)
+    if key is None:
+        return estimate_tokens(content) + MSG_OVERHEAD
+    hit = _msg_token_cache.get(key)
+    if hit is not None and hit[0] == content:
+        return hit[1]
+    tokens = estimate_tokens(content) + MSG_OVERHEAD
+    _cache_put(key, content, tokens)
+    return tokens
+
+
+def prime_message_tokens(msgs):
+    """Tokenize every uncached message in msgs with one batch encoder call.
+
+    Populates the count_message_tokens() cache so the caller's selection
+    loop does no encoding. Silently does nothing when the encoder lacks
+    encode_ordinary_batch (char-estimate fallback or non-tiktoken backend).
+    """
+    enc = _get_encoding()
+    encode_batch = getattr(enc, "encode_ordinary_batch", None)
+    if encode_batch is None:
+        return
+    pending = {}
+    for msg in msgs:
+        key = _cache_key(msg)
+        if key is None or "_tokens" in msg:
+            continue
+        content = msg["content"]
+        if len(content) > _ENCODE_CHUNK_CHARS:
+            continue
+        hit = _msg_token_cache.get(key)
+        if hit is not None and hit[0] == content:
+            continue
+        tokens = _content_token_cache.get(content)
+        if tokens is not None:
+            _cache_put(key, content, tokens + MSG_OVERHEAD)
+        else:
+            pending[key] = content
+    if len(pending) < 2:
+        return
+    encoded = encode_batch(list(pending.values()), num_threads=_BATCH_THREADS)
+    for (key, content), tokens in zip(pending.items(), encoded):
+        n = len(tokens)
+        _cache_put(key, content, n + MSG_OVERHEAD)
+        if len(content) <= _CONTENT_CACHE_MAX_CHARS:
+            _content_put(content, n)